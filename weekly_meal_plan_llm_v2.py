@@ -9,6 +9,10 @@ What it does
 - "things we'd need to have" list (non-staples only)
 - Emails the result once per week (I'm scheduling externally via Windows Task Scheduler; you might use another method).
 
+Requirements
+- pip install requests aiohttp lxml
+- orjson (optional) is used for the API JSON if it's installed
+
 Config (env vars)
 - OPENAI_API_KEY          (required, easy to create one if you don't have one)
 - OPENAI_MODEL            (optional) default: gpt-5.2
@@ -18,26 +22,67 @@ Config (env vars)
 - SMTP_HOST               (optional) default: smtp.gmail.com
 - SMTP_PORT               (optional) default: 587
 - EMAIL_SUBJECT_PREFIX    (optional) default: "Suggestions for things to eat this week"
+- OPENAI_USE_BATCH        (optional) set to "1" to go through the Batch API (half the price, can take
+                           up to 24h so schedule the task a day early). default: normal request.
+- OPENAI_BATCH_POLL_SECONDS (optional) how often to check on the batch. default: 60
+- MAX_PROMPT_LINKS        (optional) most links to put in the prompt (picked per week). default: 50
+- OPENAI_MAX_OUTPUT_TOKENS (optional) cap on the reply length. default: 900
 - MEALS_PER_WEEK          (optional) default: 7
 - RECIPES_FILE            (optional) path to text file with one URL per line. I've put mine here but feel free to change/add your own
                            default: recipes.txt beside this script.
 - INCLUDE_SWEETS          (optional) set to "1" to include dessert/sweet links. default: exclude.
+- TITLE_CACHE_FILE        (optional) where scraped page titles are cached between runs.
+                           default: ~/.cache/weekly_meal/titles.json
+- TITLE_CACHE_DAYS        (optional) how long a cached title is trusted before re-fetching. default: 30
 """
 
 from __future__ import annotations
 
 import os
+import asyncio
+import datetime
 import json
+import random
+import re
 import time
 import smtplib
 import ssl
+import threading
 from dataclasses import dataclass
 from email.message import EmailMessage
-from typing import List
+from typing import Callable, Dict, List, Optional, Tuple
 from urllib.parse import urlparse
 
+import aiohttp
 import requests
-from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+from requests.adapters import HTTPAdapter
+
+# orjson is quicker at (de)serialising the API traffic; plain json works fine if it isn't installed
+try:
+    import orjson
+
+    def _dumps(obj: object) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj: object) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _loads = json.loads
+
+# one shared session for the OpenAI calls so they reuse the connection (no new TLS handshake each time)
+_SESSION = requests.Session()
+# OpenAI calls do their own retrying (_request_with_retry), so don't stack urllib3 retries on top
+_SESSION.mount("https://api.openai.com/", HTTPAdapter(max_retries=0))
+
+# a realistic browser UA + language for scraping, otherwise some recipe sites serve a 403 page instead
+_BROWSER_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-AU,en;q=0.9",
+}
 
 # URL list + filtering
 DEFAULT_URLS: List[str] = [
@@ -52,11 +97,13 @@ DESSERT_KEYWORDS = {
     "chocolate", "nutella", "caramel", "smoothie",
 }
 
+# all the keywords in one pattern so it's a single scan per URL
+_SWEET_RE = re.compile("|".join(re.escape(k) for k in sorted(DESSERT_KEYWORDS)))
+
 # checks if the thing is a sweet treat or not (bool)
 def is_probably_sweet_url(url: str) -> bool:
     p = urlparse(url)
-    hay = (p.path + " " + p.query).lower()
-    return any(k in hay for k in DESSERT_KEYWORDS)
+    return bool(_SWEET_RE.search((p.path + " " + p.query).lower()))
 
 # grabs URLs from the recipe file
 def load_recipe_urls() -> List[str]:
@@ -64,32 +111,35 @@ def load_recipe_urls() -> List[str]:
     if not recipes_file:
         recipes_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recipes.txt")
 # cleans them up and grabs each one
-    urls: List[str] = []
     if os.path.exists(recipes_file):
         with open(recipes_file, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                urls.append(line)
+            lines = f.read().splitlines()
     else:
-        urls = list(DEFAULT_URLS)
-
-    urls = [u.strip() for u in urls if u and u.strip().startswith("http")]
+        lines = list(DEFAULT_URLS)
 
   # drop sweet treats (or not)
     include_sweets = os.getenv("INCLUDE_SWEETS", "").strip() == "1"
-    if not include_sweets:
-        urls = [u for u in urls if not is_probably_sweet_url(u)]
 
-    # De-dupe
-    seen = set()
-    out: List[str] = []
-    for u in urls:
-        if u not in seen:
-            out.append(u)
-            seen.add(u)
-    return out
+    # one pass: strip, keep only http links (this also skips blanks and # comments), filter sweets
+    urls = [
+        u for u in (ln.strip() for ln in lines)
+        if u.startswith("http") and (include_sweets or not is_probably_sweet_url(u))
+    ]
+
+    # De-dupe (dict keeps the first-seen order)
+    return list(dict.fromkeys(urls))
+
+# caps how many links go in the prompt (done before scraping so we only fetch titles we'll use);
+# the pick is seeded by ISO week so reruns in the same week match
+def pick_weekly_links(urls: List[str]) -> List[str]:
+    max_links = int(os.getenv("MAX_PROMPT_LINKS", "50").strip())
+    if max_links < 1:
+        raise RuntimeError("MAX_PROMPT_LINKS must be at least 1.")
+    if len(urls) <= max_links:
+        return urls
+    year, week, _ = datetime.date.today().isocalendar()
+    picked = random.Random(f"{year}-W{week}").sample(range(len(urls)), max_links)
+    return [urls[i] for i in sorted(picked)]
 
 #  Fetch page titles (helps the model figure out what the thing is)
 @dataclass
@@ -97,59 +147,297 @@ class LinkMeta:
     url: str
     title: str
 
-def fetch_title(url: str, timeout: int = 12) -> str:
-    try:
-        r = requests.get(url, timeout=timeout, headers={"User-Agent": "Mozilla/5.0"})
+# the title lives in <head>, so stop downloading once that closes (recipe pages can be megabytes)
+_MAX_HEAD_BYTES = 64 * 1024
+
+# returns the raw bytes + charset from the headers (if any); lxml decodes them itself
+async def _read_head(session: aiohttp.ClientSession, url: str,
+                     timeout: aiohttp.ClientTimeout) -> Tuple[bytes, Optional[str]]:
+    async with session.get(url, timeout=timeout) as r:
         r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        og = soup.find("meta", property="og:title")
-        if og and og.get("content"):
-            return og["content"].strip()
-        if soup.title and soup.title.string:
-            return soup.title.string.strip()
+        # headers arrive before the body, so skip PDFs/videos/etc. without downloading them
+        # (no Content-Type at all still gets parsed, like before)
+        content_type = r.headers.get("Content-Type", "").lower()
+        if content_type and "html" not in content_type:
+            return b"", None
+        buf = b""
+        async for chunk in r.content.iter_chunked(8192):
+            buf += chunk
+            if b"</head>" in buf.lower() or len(buf) >= _MAX_HEAD_BYTES:
+                break
+        return buf, r.charset
+
+# be polite: at most one request per second to the same site (different sites don't wait on each other)
+_HOST_MIN_INTERVAL = 1.0
+_last_hit: Dict[str, float] = {}
+
+async def _wait_for_host(url: str) -> None:
+    host = urlparse(url).netloc
+    # no await between reading and booking the slot, so this is safe without a lock on the event loop
+    now = time.monotonic()
+    slot = max(now, _last_hit.get(host, float("-inf")) + _HOST_MIN_INTERVAL)
+    _last_hit[host] = slot
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
+# (connect, read) so unreachable hosts fail fast but slow pages can still finish;
+# total caps a server that trickles bytes in just under the read timeout
+async def fetch_title(session: aiohttp.ClientSession, url: str,
+                      timeout: Tuple[float, float] = (3.0, 10.0), total: float = 15.0) -> str:
+    try:
+        client_timeout = aiohttp.ClientTimeout(total=total, sock_connect=timeout[0], sock_read=timeout[1])
+        buf, charset = await _read_head(session, url, client_timeout)
+        if not buf.strip():
+            return ""
+        # parsing bytes (not str) so XHTML pages with an <?xml encoding=...?> declaration still work
+        tree = lxml_html.fromstring(buf, parser=lxml_html.HTMLParser(encoding=charset))
+        og = tree.xpath('//meta[@property="og:title"]/@content')
+        if og and og[0].strip():
+            return og[0].strip()
+        title = tree.xpath("//title/text()")
+        if title and title[0].strip():
+            return title[0].strip()
     except Exception:
         pass
     return ""
 
-def build_link_metas(urls: List[str], max_to_fetch: int = 60) -> List[LinkMeta]:
-    metas: List[LinkMeta] = []
-    for u in urls[:max_to_fetch]:
-        metas.append(LinkMeta(url=u, title=fetch_title(u)))
-        time.sleep(0.2)
-    for u in urls[max_to_fetch:]:
-        metas.append(LinkMeta(url=u, title=""))
-    return metas
+async def _fetch_titles(urls: List[str], max_concurrency: int) -> List[str]:
+    sem = asyncio.Semaphore(max_concurrency)
 
-# API call (using Open AI but you could change provider if you like)
-# you'll need to have your key in a .cdm file in your env for this to work
-def call_openai_suggestions(link_metas: List[LinkMeta], meals_per_week: int) -> str:
-    api_key = os.getenv("OPENAI_API_KEY", "").strip()
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY environment variable must be set.")
-    model = os.getenv("OPENAI_MODEL", "gpt-5.2").strip()
+    async def bounded(session: aiohttp.ClientSession, url: str) -> str:
+        # wait for the host's slot before taking a concurrency slot, so sleepers don't block other sites
+        await _wait_for_host(url)
+        async with sem:
+            return await fetch_title(session, url)
 
-    link_lines = []
-    for m in link_metas:
-        if m.title:
-            link_lines.append(f"- {m.title} — {m.url}")
+    connector = aiohttp.TCPConnector(limit=max_concurrency)
+    async with aiohttp.ClientSession(headers=_BROWSER_HEADERS, connector=connector) as session:
+        return await asyncio.gather(*(bounded(session, u) for u in urls))
+
+# page title cache (recipes.txt barely changes week to week so no point re-scraping everything)
+def _title_cache_path() -> str:
+    path = os.getenv("TITLE_CACHE_FILE", "").strip()
+    if not path:
+        path = os.path.join(os.path.expanduser("~"), ".cache", "weekly_meal", "titles.json")
+    return path
+
+def _load_title_cache() -> Dict[str, dict]:
+    try:
+        with open(_title_cache_path(), "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict):
+        return {}
+    # skip anything malformed rather than letting one bad entry kill the run
+    return {
+        u: e for u, e in cache.items()
+        if isinstance(e, dict)
+        and isinstance(e.get("title"), str)
+        and isinstance(e.get("fetched_at"), (int, float)) and not isinstance(e.get("fetched_at"), bool)
+    }
+
+def _save_title_cache(cache: Dict[str, dict]) -> None:
+    path = _title_cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # a missing cache just means we scrape again next week
+
+# interleaves URLs by site so the concurrent fetches aren't all hitting the same host at once
+def _round_robin_by_host(urls: List[str]) -> List[str]:
+    by_host: Dict[str, List[str]] = {}
+    for u in urls:
+        by_host.setdefault(urlparse(u).netloc, []).append(u)
+    groups = list(by_host.values())
+    out: List[str] = []
+    for i in range(max((len(g) for g in groups), default=0)):
+        out.extend(g[i] for g in groups if i < len(g))
+    return out
+
+# all_urls is the full recipe list (defaults to urls); cached titles for anything not in it get pruned
+def build_link_metas(urls: List[str], max_to_fetch: int = 60, max_concurrency: int = 20,
+                     all_urls: Optional[List[str]] = None) -> List[LinkMeta]:
+    loaded = _load_title_cache()
+    keep = set(all_urls if all_urls is not None else urls) | set(urls)
+    cache = {u: e for u, e in loaded.items() if u in keep}
+    max_age = float(os.getenv("TITLE_CACHE_DAYS", "30").strip()) * 86400
+    now = time.time()
+
+    titles: Dict[str, str] = {}
+    to_fetch: List[str] = []
+    for u in urls[:max_to_fetch]:
+        entry = cache.get(u)
+        if entry and entry["title"] and now - entry["fetched_at"] < max_age:
+            titles[u] = entry["title"]
         else:
-            link_lines.append(f"- {m.url}")
-    links_block = "\n".join(link_lines)
+            to_fetch.append(u)
+
+    if to_fetch:
+        ordered = _round_robin_by_host(to_fetch)
+        fetched = dict(zip(ordered, asyncio.run(_fetch_titles(ordered, max_concurrency))))
+        titles.update(fetched)
+        # only cache hits, so failed fetches get another go next run
+        for u, title in fetched.items():
+            if title:
+                cache[u] = {"title": title, "fetched_at": now}
+    if to_fetch or cache.keys() != loaded.keys():
+        _save_title_cache(cache)
+    # keep the original order from recipes.txt
+    return [LinkMeta(url=u, title=titles.get(u, "")) for u in urls]
+
+# transient 429/5xx (often Cloudflare in front of the API) shouldn't sink the whole week's run
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+_MAX_RETRIES = 5
+
+def _retry_delay(resp: Optional[requests.Response], attempt: int) -> float:
+    retry_after = resp.headers.get("Retry-After") if resp is not None else None
+    if retry_after:
+        try:
+            return min(60.0, max(0.0, float(retry_after)))
+        except ValueError:
+            pass  # HTTP-date form, just fall back to backoff
+    return min(60.0, (2 ** attempt) + random.random())
+
+def _request_with_retry(method: str, url: str, **kwargs) -> requests.Response:
+    attempt = 0
+    while True:
+        try:
+            resp = _SESSION.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == _MAX_RETRIES:
+                raise
+            time.sleep(_retry_delay(None, attempt))
+        else:
+            if resp.status_code not in _RETRY_STATUSES or attempt == _MAX_RETRIES:
+                return resp
+            delay = _retry_delay(resp, attempt)
+            resp.close()
+            time.sleep(delay)
+        attempt += 1
+
+# Batch API (half price, but can take a while - fine for a weekly email, just schedule it earlier)
+_OPENAI_BASE = "https://api.openai.com/v1"
+_BATCH_DONE = {"completed", "failed", "expired", "cancelled"}
+
+def _openai_check(resp: requests.Response, what: str) -> requests.Response:
+    if resp.status_code >= 400:
+        raise RuntimeError(f"OpenAI {what} error {resp.status_code}: {resp.text}")
+    return resp
+
+# a cut-off reply means a half-finished meal list, so never let it through to the email
+def _raise_incomplete(response: dict) -> None:
+    reason = (response.get("incomplete_details") or {}).get("reason") or "unknown"
+    if reason == "max_output_tokens":
+        raise RuntimeError("OpenAI reply was cut off at max_output_tokens; raise OPENAI_MAX_OUTPUT_TOKENS.")
+    raise RuntimeError(f"OpenAI reply was incomplete (reason: {reason}).")
+
+def _run_openai_batch(api_key: str, payload: dict) -> dict:
+    payload = {k: v for k, v in payload.items() if k != "stream"}
+    auth = {"Authorization": f"Bearer {api_key}"}
+    line = {
+        "custom_id": f"week-{time.strftime('%Y-%m-%d')}",
+        "method": "POST",
+        "url": "/v1/responses",
+        "body": payload,
+    }
 
-  # feel free to add other stapes you want it to avoid here
-    staples = [
-        "salt", "pepper", "oil", "olive oil", "vegetable oil",
-        "butter", "flour", "sugar", "rice", "pasta", "noodles",
-        "bread", "stock cubes", "soy sauce", "vinegar",
-        "garlic", "onion", "lemon", "water",
-    ]
+    # uploading the same file twice is harmless, so that one can retry; creating the batch can't
+    upload = _openai_check(_request_with_retry(
+        "POST",
+        f"{_OPENAI_BASE}/files",
+        headers=auth,
+        data={"purpose": "batch"},
+        files={"file": ("meal_batch.jsonl", _dumps(line) + b"\n", "application/jsonl")},
+        timeout=60,
+    ), "file upload")
+
+    batch = _openai_check(_SESSION.post(
+        f"{_OPENAI_BASE}/batches",
+        headers=auth,
+        json={"input_file_id": upload.json()["id"], "endpoint": "/v1/responses", "completion_window": "24h"},
+        timeout=60,
+    ), "batch create").json()
+
+    poll_seconds = float(os.getenv("OPENAI_BATCH_POLL_SECONDS", "60").strip())
+    while batch.get("status") not in _BATCH_DONE:
+        time.sleep(poll_seconds)
+        batch = _openai_check(_request_with_retry(
+            "GET", f"{_OPENAI_BASE}/batches/{batch['id']}", headers=auth, timeout=60,
+        ), "batch status").json()
+
+    if batch["status"] != "completed" or not batch.get("output_file_id"):
+        raise RuntimeError(f"OpenAI batch {batch['id']} finished with status {batch['status']}: {batch.get('errors')}")
+
+    output = _openai_check(_request_with_retry(
+        "GET", f"{_OPENAI_BASE}/files/{batch['output_file_id']}/content", headers=auth, timeout=60,
+    ), "batch output").text
+
+    # only one request in the batch, so only one line back
+    result = _loads(output.strip().splitlines()[0])
+    response = result.get("response") or {}
+    if response.get("status_code", 500) >= 400:
+        raise RuntimeError(f"OpenAI batch request error: {result.get('error') or response.get('body')}")
+    body = response.get("body") or {}
+    if body.get("status") == "incomplete":
+        _raise_incomplete(body)
+    return body
+
+# streamed response: read timeout applies between events, not to the whole generation
+def _stream_openai_response(url: str, headers: dict, payload: dict,
+                            on_suggestions: Optional[Callable[[], None]] = None) -> dict:
+    deltas: List[str] = []
+    seen_suggestions = False
+    tail = ""  # last few chars, so a header split across deltas is still spotted
+    with _request_with_retry("POST", url, headers=headers, data=_dumps(payload), stream=True, timeout=(10, 60)) as resp:
+        if resp.status_code >= 400:
+            raise RuntimeError(f"OpenAI API error {resp.status_code}: {resp.text}")
+        # SSE is always UTF-8, so hand the raw bytes to the JSON parser rather than trusting the charset
+        for raw in resp.iter_lines():
+            if not raw or not raw.startswith(b"data:"):
+                continue
+            chunk = raw[len(b"data:"):].strip()
+            if chunk == b"[DONE]":
+                break
+            event = _loads(chunk)
+            kind = event.get("type")
+            if kind == "response.output_text.delta":
+                delta = event.get("delta", "")
+                deltas.append(delta)
+                # fires once the "Suggestions" header has been written, i.e. the model is well under way
+                if on_suggestions and not seen_suggestions:
+                    tail = tail[-len("Suggestions"):] + delta
+                    if "Suggestions" in tail:
+                        seen_suggestions = True
+                        on_suggestions()
+            elif kind == "response.completed":
+                return event.get("response") or {"output_text": "".join(deltas)}
+            elif kind == "response.incomplete":
+                _raise_incomplete(event.get("response") or {})
+            elif kind in ("response.failed", "error"):
+                raise RuntimeError(f"OpenAI API error: {event.get('response', {}).get('error') or event.get('message') or event}")
+    # no completed event means we only have part of the reply, so don't send it
+    raise RuntimeError("OpenAI stream ended before response.completed")
+
+# feel free to add other stapes you want it to avoid here
+STAPLES = [
+    "salt", "pepper", "oil", "olive oil", "vegetable oil",
+    "butter", "flour", "sugar", "rice", "pasta", "noodles",
+    "bread", "stock cubes", "soy sauce", "vinegar",
+    "garlic", "onion", "lemon", "water",
+]
 
-    prompt = f"""
+# the prompt only changes in two spots, so build everything else once at import
+_PROMPT_TEMPLATE = """
 You are helping a household with dinner ideas. You will be given a curated list of recipe links (titles included when available).
 
 Produce:
 
-1) Seven *suggestions* for dinners (exactly {meals_per_week}).
+1) Seven *suggestions* for dinners (exactly {{meals_per_week}}).
    For each suggestion:
    - Include the recipe title
    - Include the URL
@@ -162,7 +450,7 @@ Rules:
 
 2) A section titled "Things we'd need to have" with NO quantities.
    - Include only *non-staples* that someone might need to buy specially (e.g., chicken thighs, salmon, fresh herbs, coconut milk).
-   - Do NOT include common pantry staples like: {", ".join(staples)}.
+   - Do NOT include common pantry staples like: {staples}.
    - Do NOT include measurements (no grams/ml/cups/tbsp).
    - Group into exactly these headings:
      - Protein
@@ -173,7 +461,7 @@ Rules:
 Output format (exact):
 - Start with a one-line greeting.
 - Then a section header: "Suggestions"
-- Then suggestions as a numbered list 1..{meals_per_week}, each on ONE line:
+- Then suggestions as a numbered list 1..{{meals_per_week}}, each on ONE line:
   "1. <Title> — <URL> — <one-sentence summary>"
 - Then a blank line and the header: "Things we'd need to have"
 - Then the three group headings with bullet lists.
@@ -181,10 +469,29 @@ Output format (exact):
 - Use Australian names for produce, e.g. eggplant, not aubergine 
 
 Recipe links:
-{links_block}
-""".strip()
+{{links_block}}
+""".strip().format(staples=", ".join(STAPLES))
+
+# API call (using Open AI but you could change provider if you like)
+# you'll need to have your key in a .cdm file in your env for this to work
+def call_openai_suggestions(link_metas: List[LinkMeta], meals_per_week: int,
+                            on_suggestions: Optional[Callable[[], None]] = None) -> str:
+    api_key = os.getenv("OPENAI_API_KEY", "").strip()
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY environment variable must be set.")
+    model = os.getenv("OPENAI_MODEL", "gpt-5.2").strip()
+
+    link_lines = []
+    for m in link_metas:
+        if m.title:
+            link_lines.append(f"- {m.title[:80]} — {m.url}")
+        else:
+            link_lines.append(f"- {m.url}")
+    links_block = "\n".join(link_lines)
 
-    url = "https://api.openai.com/v1/responses"
+    prompt = _PROMPT_TEMPLATE.format(meals_per_week=meals_per_week, links_block=links_block)
+
+    url = f"{_OPENAI_BASE}/responses"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -193,55 +500,98 @@ Recipe links:
         "model": model,
         "input": [{"role": "user", "content": prompt}],
         "temperature": 0.4,
+        "max_output_tokens": int(os.getenv("OPENAI_MAX_OUTPUT_TOKENS", "900").strip()),
+        "stream": True,
     }
 
-    resp = requests.post(url, headers=headers, data=json.dumps(payload), timeout=60)
-    if resp.status_code >= 400:
-        raise RuntimeError(f"OpenAI API error {resp.status_code}: {resp.text}")
-
-    data = resp.json()
+    if os.getenv("OPENAI_USE_BATCH", "").strip() == "1":
+        data = _run_openai_batch(api_key, payload)
+    else:
+        data = _stream_openai_response(url, headers, payload, on_suggestions)
 
-    chunks: List[str] = []
-    for item in data.get("output", []):
-        for c in item.get("content", []):
-            if c.get("type") in ("output_text", "text"):
-                chunks.append(c.get("text", ""))
-    text = "\n".join(chunks).strip()
-    if not text:
-        text = (data.get("output_text") or "").strip()
+    chunks = [
+        c.get("text", "")
+        for item in data.get("output", [])
+        for c in item.get("content") or []
+        if c.get("type") in ("output_text", "text")
+    ]
+    text = "\n".join(chunks).strip() or (data.get("output_text") or "").strip()
     if not text:
         raise RuntimeError("OpenAI API returned no text output.")
     return text
 
 # the email part 
 # again your .cmd file will need your email credentials in it
-def send_email(body: str) -> None:
-    email_user = os.getenv("EMAIL_USER", "").strip()
-    email_pass = os.getenv("EMAIL_PASS", "").strip()
-    email_to = os.getenv("EMAIL_TO", "").strip()
-
-    if not (email_user and email_pass and email_to):
-        raise RuntimeError("EMAIL_USER, EMAIL_PASS and EMAIL_TO environment variables must be set.")
-
-    smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com").strip()
-    smtp_port = int(os.getenv("SMTP_PORT", "587").strip())
+# connect_in_background() lets the SMTP login happen while the LLM is still writing
+class EmailSender:
+
+    def __init__(self) -> None:
+        self.email_user = os.getenv("EMAIL_USER", "").strip()
+        self.email_pass = os.getenv("EMAIL_PASS", "").strip()
+        self.email_to = os.getenv("EMAIL_TO", "").strip()
+
+        if not (self.email_user and self.email_pass and self.email_to):
+            raise RuntimeError("EMAIL_USER, EMAIL_PASS and EMAIL_TO environment variables must be set.")
+
+        self.smtp_host = os.getenv("SMTP_HOST", "smtp.gmail.com").strip()
+        self.smtp_port = int(os.getenv("SMTP_PORT", "587").strip())
+
+        self._server: Optional[smtplib.SMTP] = None
+        self._error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self) -> None:
+        server: Optional[smtplib.SMTP] = None
+        try:
+            context = ssl.create_default_context()
+            server = smtplib.SMTP(self.smtp_host, self.smtp_port)
+            server.ehlo()
+            server.starttls(context=context)
+            server.ehlo()
+            server.login(self.email_user, self.email_pass)
+            self._server = server
+        except BaseException as e:
+            # don't leak the socket if starttls/login failed after connecting
+            if server is not None:
+                server.close()
+            self._error = e
+
+    def connect_in_background(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._connect, daemon=True)
+            self._thread.start()
+
+    def send(self, body: str) -> None:
+        self.connect_in_background()
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+        subject_prefix = os.getenv("EMAIL_SUBJECT_PREFIX", "Suggestions for things to eat this week").strip()
+        subject = f"{subject_prefix} — {time.strftime('%Y-%m-%d')}"
+
+        msg = EmailMessage()
+        msg["From"] = self.email_user
+        msg["To"] = self.email_to
+        msg["Subject"] = subject
+        msg.set_content(body)
+
+        with self._server as server:
+            server.send_message(msg)
+        self._server = None
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._thread.join()
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
 
-    subject_prefix = os.getenv("EMAIL_SUBJECT_PREFIX", "Suggestions for things to eat this week").strip()
-    subject = f"{subject_prefix} — {time.strftime('%Y-%m-%d')}"
-
-    msg = EmailMessage()
-    msg["From"] = email_user
-    msg["To"] = email_to
-    msg["Subject"] = subject
-    msg.set_content(body)
-
-    context = ssl.create_default_context()
-    with smtplib.SMTP(smtp_host, smtp_port) as server:
-        server.ehlo()
-        server.starttls(context=context)
-        server.ehlo()
-        server.login(email_user, email_pass)
-        server.send_message(msg)
+def send_email(body: str) -> None:
+    EmailSender().send(body)
 
 # main (running program)
 
@@ -253,9 +603,13 @@ def main() -> int:
         return 2
 
     meals_per_week = int(os.getenv("MEALS_PER_WEEK", "7").strip())
-    metas = build_link_metas(urls)
-    body = call_openai_suggestions(metas, meals_per_week)
-    send_email(body)
+    metas = build_link_metas(pick_weekly_links(urls), all_urls=urls)
+    sender = EmailSender()
+    try:
+        body = call_openai_suggestions(metas, meals_per_week, on_suggestions=sender.connect_in_background)
+        sender.send(body)
+    finally:
+        sender.close()
     return 0
 
 if __name__ == "__main__":